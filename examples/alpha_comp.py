@@ -1,78 +1,18 @@
+from multiprocessing import Pool
+
 import numpy as np
-import seaborn as sns
 import polars as pl
 
 import matplotlib.pyplot as plt
 
 from testsmart.nnm import AlphaMart, FixedBet, AGRAPA, ShrinkTrunc
 
-np.random.seed(12345)
-
-
-# For each model, run a single test and compare how each martingale evolves over time.
-
 n_total = 1000
 x = np.array([0] * 300 + [1 / 2] * 300 + [1] * 400)
-np.random.shuffle(x)
-
-tests = {
-    "ALPHA + Shrink Trunc (eta0=0.75)": AlphaMart(
-        n_total=n_total, estim=ShrinkTrunc(eta0=0.75)
-    ),
-    "ALPHA + Shrink Trunc (eta0=0.6)": AlphaMart(
-        n_total=n_total, estim=ShrinkTrunc(eta0=0.6)
-    ),
-    "ALPHA + Shrink Trunc (eta0=0.55=True mean)": AlphaMart(
-        n_total=n_total, estim=ShrinkTrunc(eta0=0.55)
-    ),
-    "ALPHA + Fixed Bet": AlphaMart(n_total=n_total, estim=FixedBet()),
-    "ALPHA + aGRAPA": AlphaMart(n_total=n_total, estim=AGRAPA()),
-}
-
-count = []
-test_name = []
-e_proc = []
-p_val = []
-eta_estim = []
-
-for name, test in tests.items():
-    for xi in x:
-        if test.stopped:
-            break
-        _ = test.update(np.array([xi]))
-        count.append(test.summaries.count)
-        test_name.append(name)
-        e_proc.append(float(test.e_process[-1]))
-        p_val.append(float(test.pval))
-        eta_estim.append(float(test._eta_history[-1]))
-
-df = pl.DataFrame(
-    {
-        "count": count,
-        "test": test_name,
-        "e-process": e_proc,
-        "p-value": p_val,
-        "eta": eta_estim,
-    }
-)
 
-plt.figure(figsize=(10, 6))
-sns.lineplot(data=df, x="count", y="e-process", hue="test")
-plt.axhline(20, ls="--")
-plt.savefig("competition_e_process.png")
 
-plt.figure(figsize=(10, 6))
-sns.lineplot(data=df, x="count", y="eta", hue="test")
-plt.axhline(0.55, ls="--")
-plt.savefig("competition_eta_estimates.png")
-
-# Run same test with new sample 1000 times and compare stopping times for each model.
-
-test_name = []
-stop_time = []
-
-for _ in range(1000):
-    tests = {
+def new_tests():
+    return {
         "ALPHA + Shrink Trunc (eta0=0.75)": AlphaMart(
             n_total=n_total, estim=ShrinkTrunc(eta0=0.75)
         ),
@@ -85,17 +25,117 @@ for _ in range(1000):
         "ALPHA + Fixed Bet": AlphaMart(n_total=n_total, estim=FixedBet()),
         "ALPHA + aGRAPA": AlphaMart(n_total=n_total, estim=AGRAPA()),
     }
-    np.random.shuffle(x)
-    for name, test in tests.items():
-        for xi in x:
-            if test.stopped:
-                break
-            _ = test.update(np.array([xi]))
-        test_name.append(name)
-        stop_time.append(test.summaries.count)
-
-df = pl.DataFrame({"test": test_name, "stopping time": stop_time})
-
-plt.figure(figsize=(10, 6))
-sns.boxplot(data=df, x="stopping time", y="test")
-plt.savefig("competition_stopping_times.png")
+
+
+# Tests reused by every trial run in this process
+trial_tests = new_tests()
+
+
+def stopping_time(test):
+    """
+    The number of observations a test takes to reject. The p-values are
+    non-increasing, so this is the first time the p-value drops below alpha, or
+    every observation if it never does.
+    """
+    stop = np.flatnonzero(test.p_history < test.alpha)
+    return stop[0] + 1 if stop.size else test.summaries.count
+
+
+def run_trial(sample):
+    """
+    Run each test on a shuffled sample, returning the stopping times in the same
+    order as the tests.
+    """
+    stop_times = np.empty(len(trial_tests), dtype=np.int64)
+    for i, test in enumerate(trial_tests.values()):
+        test.reset()
+        _ = test.update(sample)
+        stop_times[i] = stopping_time(test)
+    return stop_times
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(12345)
+
+    # For each model, run a single test and compare how each martingale evolves
+    # over time.
+
+    x = rng.permutation(x)
+    tests = new_tests()
+    names = np.array(list(tests))
+
+    for test in tests.values():
+        _ = test.update(x)
+    stops = [stopping_time(test) for test in tests.values()]
+
+    # Each test keeps its full history, so the columns are joined once at the end,
+    # each cut off at the test's stopping time.
+    df = pl.DataFrame(
+        {
+            "count": np.concatenate([np.arange(1, stop + 1) for stop in stops]),
+            "test": np.repeat(names, stops),
+            "e-process": np.concatenate(
+                [test.e_process[:stop] for test, stop in zip(tests.values(), stops)]
+            ),
+            "p-value": np.concatenate(
+                [test.p_history[:stop] for test, stop in zip(tests.values(), stops)]
+            ),
+            "eta": np.concatenate(
+                [test._eta_history[:stop] for test, stop in zip(tests.values(), stops)]
+            ),
+        }
+    )
+
+    # Each test has one row per count, so its trace is plotted directly.
+    groups = df.group_by("test", maintain_order=True)
+
+    plt.figure(figsize=(10, 6))
+    for (name,), group in groups:
+        plt.plot(group["count"], group["e-process"], label=name)
+    plt.axhline(20, ls="--")
+    plt.xlabel("count")
+    plt.ylabel("e-process")
+    plt.legend(title="test")
+    plt.savefig("competition_e_process.png")
+
+    plt.figure(figsize=(10, 6))
+    for (name,), group in groups:
+        plt.plot(group["count"], group["eta"], label=name)
+    plt.axhline(0.55, ls="--")
+    plt.xlabel("count")
+    plt.ylabel("eta")
+    plt.legend(title="test")
+    plt.savefig("competition_eta_estimates.png")
+
+    # Run same test with new sample 1000 times and compare stopping times for each
+    # model. The trials are independent, so they are shared between processes.
+
+    # Draw every trial's sample order up front: row i of samples is trial i.
+    samples = np.broadcast_to(x, (1000, n_total)).copy()
+    rng.permuted(samples, axis=1, out=samples)
+
+    # Row i holds the stopping times of each test for the i-th trial to finish.
+    stop_time = np.empty((len(samples), len(names)), dtype=np.int64)
+
+    with Pool() as pool:
+        trials = pool.imap_unordered(run_trial, samples, chunksize=10)
+        for i, stop_times in enumerate(trials):
+            stop_time[i] = stop_times
+
+    df = pl.DataFrame(
+        {"test": np.tile(names, len(samples)), "stopping time": stop_time.ravel()}
+    )
+
+    groups = df.group_by("test", maintain_order=True)
+
+    plt.figure(figsize=(10, 6))
+    plt.boxplot(
+        [group["stopping time"].to_numpy() for _, group in groups],
+        tick_labels=[name for (name,), _ in groups],
+        orientation="horizontal",
+    )
+    plt.xlabel("stopping time")
+    plt.ylabel("test")
+    plt.gca().invert_yaxis()  # List the tests from the top down
+    plt.tight_layout()
+    plt.savefig("competition_stopping_times.png")
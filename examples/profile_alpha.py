@@ -2,13 +2,20 @@ from testsmart.nnm import AlphaMart
 
 import numpy as np
 
+# Number of observations passed to each call to `update`.
+BLOCK = 1024
+
 x = np.array([0] * 40000 + [1 / 2] * 30000 + [1] * 40000)
-np.random.shuffle(x)
+x = np.random.default_rng().permutation(x)
 
 am = AlphaMart()
-for xi in x:
-    am.update([xi])
+for start in range(0, len(x), BLOCK):
+    am.update(x[start : start + BLOCK])
     if am.stopped:
         break
 
-print(am.summaries.count)
+# The p-values are non-increasing, so the exact stopping time within the final
+# block is the first time the p-value drops below alpha.
+p = np.asarray(am.p_history)
+stop = np.flatnonzero(p < am.alpha)
+print(stop[0] + 1 if stop.size else am.summaries.count)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from testsmart.hypothesis import SeqHypothesisTest
+
+
+class TestSeqHypothesisTest:
+    """
+    Tests for SeqHypothesisTest.
+    """
+
+    x = np.array([1.5, 2.5, 1.7, 1.0, 1.2])
+
+    def test_observations_are_all_updates(self):
+        test = SeqHypothesisTest(alpha=0.05, n_total=np.inf)
+        test.update(self.x[:2])
+        test.update(self.x[2])
+        test.update(self.x[3:])
+        assert np.array_equal(test.observations, self.x)
+        assert test.summary()["n_observations"] == len(self.x)
+
+    def test_observations_are_not_copied_on_access(self):
+        test = SeqHypothesisTest(alpha=0.05, n_total=np.inf)
+        test.update(self.x[:2])
+        test.update(self.x[2:])
+        assert test.observations is test.observations
+        with pytest.raises(ValueError):
+            test.observations[0] = 0
+
+    def test_observations_survive_buffer_growth(self):
+        test = SeqHypothesisTest(alpha=0.05, n_total=np.inf)
+        x = np.arange(100.0)
+        for start in range(0, len(x), 7):
+            test.update(x[start : start + 7])
+        assert np.array_equal(test.observations, x)
@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+import testsmart.nnm
+from testsmart.hypothesis import Decision
+from testsmart.nnm import AlphaMart, AGRAPA, Bet, Estimator, FixedBet, ShrinkTrunc
+
+
+class TestAlphaMart:
+    """
+    Tests for AlphaMart.
+    """
+
+    x = np.array([1.0, 0.5, 1.0, 0.0, 1.0, 1.0, 0.5, 1.0, 1.0, 1.0])
+
+    def test_reset_matches_new_test(self):
+        for estim in [ShrinkTrunc, AGRAPA]:
+            used = AlphaMart(n_total=20, estim=estim())
+            used.update(self.x[::-1])
+            used.reset()
+            used.update(self.x)
+            fresh = AlphaMart(n_total=20, estim=estim())
+            fresh.update(self.x)
+            assert np.allclose(used.p_history, fresh.p_history)
+            assert used.summaries.count == len(self.x)
+
+    def test_compiled_shrink_trunc_matches_numpy(self, monkeypatch):
+        x = np.random.default_rng(1).permutation(np.repeat([0, 0.5, 1], [30, 30, 40]))
+
+        def run():
+            am = AlphaMart(n_total=100, estim=ShrinkTrunc(n_total=100, f=0.5))
+            am.update(x[:40])
+            am.update(x[40:])
+            return am
+
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", True)
+        compiled = run()
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", False)
+        vectorised = run()
+        assert compiled._update_batch == compiled._update_jit
+        assert vectorised._update_batch == vectorised._update_numpy
+        for history in ["_eta_history", "e_hist", "e_process", "p_history"]:
+            assert np.allclose(getattr(compiled, history), getattr(vectorised, history))
+
+    def test_batch_update_matches_single_updates(self):
+        for estim in [ShrinkTrunc, AGRAPA, FixedBet]:
+            batch = AlphaMart(n_total=20, estim=estim())
+            batch.update(self.x)
+            single = AlphaMart(n_total=20, estim=estim())
+            for xi in self.x:
+                single.update([xi])
+            assert np.allclose(batch._eta_history, single._eta_history)
+            assert np.allclose(batch.p_history, single.p_history)
+
+    def test_estimators_without_estim_at_are_updated_one_at_a_time(self):
+        class Halfway(Estimator):
+            def estim(self):
+                return (self.summaries.mean + 1) / 2
+
+        class Half(Bet):
+            def bet(self):
+                return 0.5
+
+        for estim in [Halfway, Half]:
+            batch = AlphaMart(estim=estim())
+            batch.update(self.x)
+            single = AlphaMart(estim=estim())
+            for xi in self.x:
+                single.update([xi])
+            assert np.allclose(batch._eta_history, single._eta_history)
+            assert np.allclose(batch.p_history, single.p_history)
+
+    def test_estimators_must_implement_an_estimate(self):
+        with pytest.raises(TypeError):
+            Estimator()
+        with pytest.raises(TypeError):
+            Bet()
+        with pytest.raises(TypeError):
+
+            class NoEstimate(Estimator):
+                pass
+
+        with pytest.raises(TypeError):
+
+            class NoBet(Bet):
+                pass
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_empty_update_changes_nothing(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", has_numba)
+        am = AlphaMart(n_total=20)
+        am.update([])
+        am.update(self.x)
+        am.update([])
+        fresh = AlphaMart(n_total=20)
+        fresh.update(self.x)
+        assert np.allclose(am.p_history, fresh.p_history)
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_results_do_not_depend_on_batch_splits(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", has_numba)
+        # Non-dyadic values, with a constant run that must have zero variance however
+        # it is split, since f > 0 divides by the standard deviation
+        x = np.array([0.7] * 10 + [0.1, 0.7, 0.3] * 30)
+        results = []
+        for splits in [[], [3], [1, 2, 5], [4, 40], range(1, len(x))]:
+            am = AlphaMart(estim=ShrinkTrunc(f=0.5))
+            for part in np.split(x, splits):
+                am.update(part)
+            results.append(am)
+        for am in results[1:]:
+            assert np.allclose(am._eta_history, results[0]._eta_history)
+            assert np.allclose(am.p_history, results[0].p_history)
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    @pytest.mark.parametrize("estim", [FixedBet, ShrinkTrunc, AGRAPA])
+    def test_rejection_survives_exhausted_population(
+        self, monkeypatch, has_numba, estim
+    ):
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", has_numba)
+        x = [1.0] * 20 + [0.0] * 20
+        # The out-of-sample mean is 0/0 after the last observation
+        batch = AlphaMart(n_total=40, estim=estim())
+        assert batch.update(x) == Decision.REJECT
+        assert batch.stopped
+        single = AlphaMart(n_total=40, estim=estim())
+        for xi in x:
+            single.update([xi])
+        assert np.allclose(batch.p_history, single.p_history)
+
+    def test_e_process_is_accumulated_in_log_space(self):
+        am = AlphaMart()
+        am.update(np.ones(2000))
+        # The e-process itself overflows, but its log does not
+        assert np.isinf(am.e_process[-1])
+        assert np.isfinite(am._log_e_process[-1])
+        assert np.allclose(am.e_process[:10], np.cumprod(am.e_hist[:10]))
+
+    def test_e_process_is_kept_up_to_date_between_updates(self):
+        rng = np.random.default_rng(0)
+        x = rng.uniform(0.4, 1, 1500)
+        am = AlphaMart()
+        latest = []
+        for part in np.split(x, [1, 2, 700, 701]):
+            am.update(part)
+            latest.append(am.e_process[-1])
+        assert np.allclose(am.e_process, np.exp(am._log_e_process))
+        assert np.allclose(latest, am.e_process[[0, 1, 699, 700, 1499]])
+        am.reset()
+        assert len(am.e_process) == 0
+
+
+class TestShrinkTrunc:
+    """
+    Tests for ShrinkTrunc.
+    """
+
+    def test_batch_estimates_match_single_estimates(self):
+        estim = ShrinkTrunc(f=0.5)
+        prev_sums = np.array([np.nan, 1.0, 1.5, 2.5])
+        prev_vars = np.array([np.nan, 0.0, 0.0625, 0.1875])
+        counts = np.arange(1, 5)
+        m = np.array([0.5, 0.49, 0.48, 0.47])
+        assert np.allclose(
+            estim.estim_batch(prev_sums, prev_vars, counts, m),
+            [estim.estim_at(*stats) for stats in zip(prev_sums, prev_vars, counts, m)],
+        )
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_changed_parameters_are_used(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.nnm, "HAS_NUMBA", has_numba)
+        x = np.array([1.0, 0.5, 0.2, 0.9])
+        estim = ShrinkTrunc()
+        estim.estim_at(np.nan, np.nan, 1, 0.5)  # Fill the table
+        estim.c = 0.05
+        estim.d = 20
+        estim.eta0 = 0.9
+        am = AlphaMart(estim=estim)
+        am.update(x)
+        fresh = AlphaMart(estim=ShrinkTrunc(eta0=0.9, c=0.05, d=20))
+        fresh.update(x)
+        assert np.allclose(am._eta_history, fresh._eta_history)
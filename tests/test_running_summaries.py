@@ -1,6 +1,6 @@
 import numpy as np
 
-from testsmart.utils import RunningSummaries, FPRunningSummaries
+from testsmart.utils import RunningSummaries, FPRunningSummaries, grow_buffers
 
 
 class TestRunningSummaries:
@@ -31,3 +31,103 @@ class TestRunningSummaries:
         rs = FPRunningSummaries(pop_size=len(self.x), pop_mean=np.mean(self.x))
         rs.add(self.x)
         assert rs.oos_count == 0
+
+    def test_historical_vars_are_partial_vars(self):
+        rs = RunningSummaries()
+        rs.add(self.x[:3])
+        rs.add(self.x[3:4])
+        rs.add(self.x[4:])
+        assert np.allclose(
+            rs.hist_vars, [np.var(self.x[: i + 1]) for i in range(len(self.x))]
+        )
+
+    def test_historical_sums_are_partial_sums(self):
+        rs = RunningSummaries()
+        rs.add(self.x[:5])
+        rs.add(self.x[5:])
+        assert np.allclose(rs.hist_sums, np.cumsum(self.x))
+
+    def test_summaries_survive_buffer_growth(self):
+        x = np.tile(self.x, 5)
+        rs = FPRunningSummaries(pop_size=len(x), pop_mean=np.mean(x))
+        for i in range(0, len(x), 3):
+            rs.add(x[i : i + 3])
+        assert np.allclose(rs.hist_sums, np.cumsum(x))
+        assert np.isclose(rs.var, np.var(x))
+        assert rs.oos_count == 0
+
+    def test_single_additions_match_batch_addition(self):
+        single = RunningSummaries()
+        for xi in self.x:
+            single.add([xi])
+        batch = RunningSummaries()
+        batch.add(self.x)
+        assert np.allclose(single.hist_means, batch.hist_means)
+        assert np.allclose(single.hist_vars, batch.hist_vars)
+
+    def test_historical_oos_means_are_remaining_means(self):
+        x = np.tile(self.x, 3)
+        rs = FPRunningSummaries(pop_size=len(x), pop_mean=np.mean(x))
+        rs.add(x[:5])
+        rs.add(x[5:-1])
+        remaining = [np.mean(x[i:]) for i in range(len(x))]
+        assert np.allclose(rs.hist_oos_means, remaining)
+        assert np.isclose(rs.prev_oos_mean, remaining[-2])
+
+    def test_previous_summaries_are_second_to_last(self):
+        rs = RunningSummaries()
+        rs.add(self.x[:1])
+        assert rs.prev_sum == 0 and np.isnan(rs.prev_var)
+        rs.add(self.x[1:4])
+        rs.add(self.x[4:5])
+        assert np.isclose(rs.prev_sum, np.sum(self.x[:4]))
+        assert np.isclose(rs.prev_mean, np.mean(self.x[:4]))
+        assert np.isclose(rs.prev_var, np.var(self.x[:4]))
+
+    def test_data_only_kept_on_request(self):
+        assert RunningSummaries().hist_data is None
+        rs = RunningSummaries(keep_data=True)
+        rs.add(self.x[:1])
+        rs.add(self.x[1:])
+        assert np.array_equal(rs.hist_data, self.x)
+
+    def test_variance_is_stable_for_large_offsets(self):
+        x = 1e9 + self.x
+        rs = RunningSummaries()
+        rs.add(x[:3])
+        rs.add(x[3:])
+        assert np.allclose(rs.hist_vars[1:], [np.var(self.x[:i]) for i in range(2, 9)])
+
+    def test_constant_data_has_zero_variance_in_any_batches(self):
+        for splits in [[3], [1, 2, 5], [4, 6]]:
+            rs = RunningSummaries()
+            for part in np.split(np.full(10, 0.7), splits):
+                rs.add(part)
+            assert np.all(rs.hist_vars == 0)
+
+    def test_batch_variance_is_accurate_for_small_spreads(self):
+        rng = np.random.default_rng(1)
+        x = 1e3 + 1e-8 * rng.standard_normal(400)
+        devs = x - 1e3
+        rs = RunningSummaries()
+        rs.add(x)
+        expected = [np.var(devs[:i]) for i in range(2, 401)]
+        assert np.allclose(rs.hist_vars[1:], expected, rtol=1e-8, atol=0)
+
+
+class TestGrowBuffers:
+    """
+    Tests for grow_buffers.
+    """
+
+    def test_buffers_with_room_are_unchanged(self):
+        a, b = np.arange(4.0), np.arange(8.0)
+        grown = grow_buffers(2, 2, a, b)
+        assert grown[0] is a and grown[1] is b
+
+    def test_full_buffers_at_least_double_and_keep_entries(self):
+        a = np.arange(4.0)
+        (grown,) = grow_buffers(3, 2, a)
+        assert grown.size == 8 and np.array_equal(grown[:3], a[:3])
+        (grown,) = grow_buffers(3, 20, a)
+        assert grown.size == 23 and np.array_equal(grown[:3], a[:3])
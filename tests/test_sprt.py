@@ -0,0 +1,165 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import testsmart.sprt
+from testsmart.hypothesis import Decision
+from testsmart.sprt import (
+    SPRT,
+    ExponentialLogLikelihood,
+    NormalLogLikelihood,
+    sprt_batch,
+)
+
+
+class TestSPRT:
+    """
+    Tests for SPRT.
+    """
+
+    x = np.array([0.5, 1.5, 1.7, 1.9, 1.0])
+
+    def exp_sprt(self):
+        return SPRT(
+            alpha=0.05,
+            beta=0.05,
+            theta0=1,
+            theta1=2,
+            loglikelihood=ExponentialLogLikelihood(),
+        )
+
+    def test_exponential_rejects(self):
+        sprt = self.exp_sprt()
+        assert sprt.update(self.x) == Decision.REJECT
+
+    def test_normal_accepts(self):
+        sprt = SPRT(
+            alpha=0.05,
+            beta=0.05,
+            theta0=1,
+            theta1=2,
+            loglikelihood=NormalLogLikelihood(sigma=1),
+        )
+        assert sprt.update([1.5, 0.0, 2.4, -1.0]) == Decision.ACCEPT
+
+    def test_incremental_updates_match_batch_update(self):
+        batch = self.exp_sprt()
+        batch.update(self.x)
+        incremental = self.exp_sprt()
+        for xi in self.x:
+            incremental.update(xi)
+        assert np.allclose(batch.S, incremental.S)
+        assert np.array_equal(batch.observations, incremental.observations)
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_2d_input_is_flattened(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.sprt, "HAS_NUMBA", has_numba)
+        sprt = self.exp_sprt()
+        flat = self.exp_sprt()
+        assert sprt.update(self.x[:4].reshape(2, 2)) == flat.update(self.x[:4])
+        assert np.allclose(sprt.S, flat.S)
+
+    def test_single_observation_containers_match_scalars(self):
+        scalar = self.exp_sprt()
+        for xi in self.x:
+            scalar.update(xi)
+        for wrap in [lambda xi: [xi], lambda xi: np.array([xi]), np.atleast_2d]:
+            wrapped = self.exp_sprt()
+            for xi in self.x:
+                wrapped.update(wrap(xi))
+            assert np.array_equal(wrapped.S, scalar.S)
+            assert np.array_equal(wrapped.observations, scalar.observations)
+
+    def test_partial_sums_are_cumulative_llr(self):
+        sprt = self.exp_sprt()
+        sprt.update(self.x[:2])
+        sprt.update(self.x[2:])
+        ll = ExponentialLogLikelihood()
+        llr = ll.ll(self.x, 1) - ll.ll(self.x, 2)
+        assert np.allclose(sprt.S, np.concatenate([[0], np.cumsum(llr)]))
+
+    def test_summary_counts_observations(self):
+        sprt = self.exp_sprt()
+        sprt.update(self.x[:2])
+        sprt.update(self.x[2:])
+        assert sprt.summary()["n"] == len(self.x)
+
+    def test_closed_form_llr_matches_loglikelihoods(self):
+        for loglikelihood in [ExponentialLogLikelihood(), NormalLogLikelihood(2)]:
+            assert np.allclose(
+                loglikelihood.llr(self.x, 1, 2),
+                loglikelihood.ll(self.x, 1) - loglikelihood.ll(self.x, 2),
+            )
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_batch_stops_at_first_crossing(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.sprt, "HAS_NUMBA", has_numba)
+        sprt = self.exp_sprt()
+        # The partial sum crosses b after the first observation, then falls back.
+        assert sprt.update([5.0, 0.0, 0.0, 0.0, 0.0]) == Decision.REJECT
+        assert sprt.stopped
+        assert len(sprt.S) == 2
+        assert sprt.summary()["n"] == 1
+
+    def test_partial_sums_survive_buffer_growth(self):
+        sprt = self.exp_sprt()
+        x = np.log(2) + np.linspace(-0.01, 0.01, 200)
+        for xi in x:
+            sprt.update(xi)
+        assert np.allclose(sprt.S, np.concatenate([[0], np.cumsum(x - np.log(2))]))
+
+    def test_reset_matches_new_test(self):
+        sprt = self.exp_sprt()
+        sprt.update([5.0])
+        sprt.reset()
+        assert not sprt.stopped
+        sprt.update(self.x)
+        fresh = self.exp_sprt()
+        fresh.update(self.x)
+        assert np.allclose(sprt.S, fresh.S)
+        assert sprt.decision == fresh.decision
+
+    def test_reset_leaves_earlier_partial_sums_intact(self):
+        sprt = self.exp_sprt()
+        sprt.update(self.x[:2])
+        S = sprt.S
+        before = S.copy()
+        sprt.reset()
+        sprt.update([5.0, 5.0])
+        assert np.array_equal(S, before)
+        with pytest.raises(ValueError):
+            S[0] = 1
+
+    def test_pickle_round_trip(self):
+        sprt = self.exp_sprt()
+        sprt.update(self.x[:2])
+        copy = pickle.loads(pickle.dumps(sprt))
+        assert sprt.update(self.x[2:]) == copy.update(self.x[2:])
+        assert np.allclose(sprt.S, copy.S)
+
+    def test_bound_llr_matches_loglikelihood(self):
+        sprt = self.exp_sprt()
+        assert np.allclose(
+            sprt.llr(self.x), ExponentialLogLikelihood().llr(self.x, 1, 2)
+        )
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_batch_trials_match_sequential_tests(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.sprt, "HAS_NUMBA", has_numba)
+        x = np.random.default_rng(0).exponential(1.5, size=(50, 40))
+        decisions, n, S = sprt_batch(self.exp_sprt(), x)
+        for i in range(len(x)):
+            sprt = self.exp_sprt()
+            sprt.update(x[i])
+            assert decisions[i] == sprt.decision
+            assert n[i] == sprt.summary()["n"]
+            assert np.isclose(S[i], sprt.S[-1])
+
+    @pytest.mark.parametrize("has_numba", [True, False])
+    def test_batch_without_observations_continues(self, monkeypatch, has_numba):
+        monkeypatch.setattr(testsmart.sprt, "HAS_NUMBA", has_numba)
+        decisions, n, S = sprt_batch(self.exp_sprt(), np.empty((3, 0)))
+        assert all(decision == Decision.CONTINUE for decision in decisions)
+        assert np.array_equal(n, [0, 0, 0])
+        assert np.array_equal(S, [0, 0, 0])
@@ -8,6 +8,8 @@ from enum import Enum
 
 import numpy as np
 
+from testsmart.utils import grow_buffers
+
 
 class Decision(Enum):
     """
@@ -28,6 +30,8 @@ class HypothesisTest(ABC):
     A base class for implementing hypothesis tests.
     """
 
+    __slots__ = ("alpha", "decision", "_pval")
+
     alpha: float
     decision: Decision
 
@@ -50,6 +54,14 @@ class HypothesisTest(ABC):
         """
         pass
 
+    def reset(self) -> None:
+        """
+        Resets the test to the state it was in before any data was observed, so that
+        it can be reused without being reconstructed.
+        """
+        self.decision = Decision.CONTINUE
+        self._pval = None
+
     def summary(self) -> dict:
         """
         Important summaries for the test.
@@ -66,6 +78,13 @@ class SeqHypothesisTest(HypothesisTest):
     A base class for implementing sequential hypothesis tests.
     """
 
+    __slots__ = ("_obs", "_n_obs", "_obs_view", "stopped", "n_total", "finite")
+
+    #: Indicates whether a sequential test is stopped or not. A test is considered
+    #: stopped if its' decision is not to continue sampling. Subclasses must keep this
+    #: in step with `decision` whenever they update it.
+    stopped: bool
+
     def __init__(self, alpha: float, n_total: int) -> None:
         """
         Instantiate a new SeqHypothesisTest
@@ -77,28 +96,60 @@ class SeqHypothesisTest(HypothesisTest):
         :type n_total: int
         """
         super().__init__(alpha)
-        self._observations = []
+        # Observations are stored in a buffer whose first `_n_obs` entries are in use.
+        # The buffer doubles in size when full.
+        self._obs = np.empty(16)
+        self._n_obs = 0
+        self._obs_view = None
+        self.stopped = False
         self.n_total = n_total
         self.finite = np.isfinite(n_total)
 
     @property
-    def observations(self) -> list[float]:
-        return self.observations
+    def observations(self) -> np.ndarray:
+        """
+        All observations taken so far, in the order they were observed. The array is
+        a read-only view of the internal buffer, shared between calls until more data
+        is observed.
 
-    @property
-    def stopped(self) -> bool:
+        :return: The observed data.
+        :rtype: numpy.ndarray
         """
-        Indicates whether a sequential test is stopped or not. A test is considered
-        stopped if its' decision is not to continue sampling.
+        if self._obs_view is None:
+            self._obs_view = self._obs[: self._n_obs]
+            self._obs_view.flags.writeable = False
+        return self._obs_view
 
-        :return: True if the test is stopped, False otherwise.
-        :rtype: bool
+    def _reserve_obs(self, k: int) -> None:
+        """
+        Grows the observation buffer if needed, so that it can hold k more
+        observations.
         """
-        return self.decision != Decision.CONTINUE
+        if self._n_obs + k > self._obs.size:
+            (self._obs,) = grow_buffers(self._n_obs, k, self._obs)
+        self._obs_view = None
 
     def update(self, x: list[float]) -> Decision:
-        self._observations.extend(x)
-        pass
+        x = np.asarray(x, dtype=float).ravel()
+        self._reserve_obs(len(x))
+        self._obs[self._n_obs : self._n_obs + len(x)] = x
+        self._n_obs += len(x)
+
+    def _observe_scalar(self, xi: float) -> None:
+        """
+        Records a single observation without wrapping it in an array.
+        """
+        self._reserve_obs(1)
+        self._obs[self._n_obs] = xi
+        self._n_obs += 1
+
+    def reset(self) -> None:
+        super().reset()
+        # A new buffer, so that earlier views of the observations are left intact
+        self._obs = np.empty(16)
+        self._n_obs = 0
+        self._obs_view = None
+        self.stopped = False
 
     def summary(self) -> dict:
         """
@@ -111,5 +162,5 @@ class SeqHypothesisTest(HypothesisTest):
         """
         return dict(
             super().summary(),
-            **{"n_observations": len(self._observations), "n_total": self.n_total},
+            **{"n_observations": self._n_obs, "n_total": self.n_total},
         )
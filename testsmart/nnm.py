@@ -1,9 +1,17 @@
+import math
+
 import numpy as np
 
 from abc import ABC, abstractmethod
 
 from testsmart.hypothesis import SeqHypothesisTest, Decision
-from testsmart.utils import RunningSummaries, FPRunningSummaries
+from testsmart.utils import (
+    RunningSummaries,
+    FPRunningSummaries,
+    HAS_NUMBA,
+    grow_buffers,
+    njit,
+)
 
 
 def bet_to_estimate(lam: float, mu: float, u: float = 1):
@@ -13,25 +21,78 @@ def bet_to_estimate(lam: float, mu: float, u: float = 1):
 class Estimator(ABC):
     """
     A base class for implementing restricted estimators for the mean of a bounded,
-    non-negative random variable.
+    non-negative random variable. Subclasses implement `estim_at`, or override
+    `estim` directly, in which case tests can only use them one observation at a
+    time.
     """
 
+    __slots__ = ("u", "t", "n_total", "_finite", "summaries")
+
     def __init__(self, n_total: int = np.inf, u: float = 1, t: float = 1 / 2):
         self.u = u
         self.t = t
         self.n_total = n_total
+        self._finite = bool(np.isfinite(n_total))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.estim_at, "__isabstractmethod__", False):
+            if cls.estim is Estimator.estim:
+                raise TypeError(f"{cls.__name__} must implement estim_at or estim")
+            # Without estim_at there is no batch path, and tests take observations
+            # one at a time
+            cls.estim_at = None
 
-    @abstractmethod
     def estim(self) -> float:
         """
         Returns an estimate of the mean for a NonnegMean test.
         """
+        m = self.summaries.oos_mean if self._finite else self.t
+        return self.estim_at(
+            self.summaries.prev_sum,
+            self.summaries.prev_var,
+            self.summaries.count,
+            m,
+        )
+
+    @abstractmethod
+    def estim_at(self, prev_sum: float, prev_var: float, count: int, m: float) -> float:
+        """
+        Returns an estimate of the mean, given the sum and variance of the data before
+        the last observation, the number of observations and the out-of-sample mean.
+        """
         pass
 
+    def estim_batch(
+        self,
+        prev_sums: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Returns the estimates of the mean just after each of a batch of observations,
+        given the arguments of `estim_at` for each observation as arrays.
+        """
+        return np.array(
+            [self.estim_at(*stats) for stats in zip(prev_sums, prev_vars, counts, m)],
+            dtype=float,
+        )
+
+    def oos_means(self, k: int) -> np.ndarray:
+        """
+        Returns the out-of-sample means used by the estimator just after each of the
+        last k observations.
+        """
+        if self._finite:
+            return self.summaries.hist_oos_means[self.summaries.count - k + 1 :]
+        return np.full(k, float(self.t))
+
     def set_u_t_n(self, u: float, t: float, n_total: float) -> None:
         self.u = u
         self.t = t
         self.n_total = n_total
+        self._finite = bool(np.isfinite(n_total))
 
     def override_summaries(
         self, summaries: RunningSummaries | FPRunningSummaries
@@ -40,6 +101,17 @@ class Estimator(ABC):
 
 
 class ShrinkTrunc(Estimator):
+    __slots__ = (
+        "_eps",
+        "_u_clip",
+        "_eta0",
+        "_c",
+        "_d",
+        "f",
+        "minsd",
+        "_d_eta0",
+        "_c_over_sqrt",
+    )
 
     def __init__(
         self,
@@ -53,65 +125,198 @@ class ShrinkTrunc(Estimator):
         minsd: float | None = 1e-6,
     ):
         super().__init__(n_total, u, t)
-        if np.isfinite(n_total):
+        if self._finite:
             self.summaries = FPRunningSummaries(n_total, t)
         else:
             self.summaries = RunningSummaries()
-        self.eta0 = eta0 if eta0 else u * (1 - np.finfo(float).eps)
-        self.c = c if c else (self.eta0 - self.t) / 2
-        self.d = d
+        self._eps = np.finfo(float).eps
+        # Upper limit for the estimates, just below u
+        self._u_clip = u * (1 - self._eps)
+        self._eta0 = eta0 if eta0 else self._u_clip
+        self._c = c if c else (self._eta0 - self.t) / 2
+        self._d = d
         self.f = f
         self.minsd = minsd
+        self._reset_constants()
 
-    def estim(self) -> float:
+    @property
+    def eta0(self) -> float:
+        """
+        The value the estimates are shrunk towards.
+        """
+        return self._eta0
+
+    @eta0.setter
+    def eta0(self, eta0: float) -> None:
+        self._eta0 = eta0
+        self._reset_constants()
+
+    @property
+    def c(self) -> float:
+        """
+        The size of the truncation margin above the out-of-sample mean.
+        """
+        return self._c
+
+    @c.setter
+    def c(self, c: float) -> None:
+        self._c = c
+        self._reset_constants()
+
+    @property
+    def d(self) -> int:
+        """
+        The weight given to eta0, in number of observations.
+        """
+        return self._d
+
+    @d.setter
+    def d(self, d: int) -> None:
+        self._d = d
+        self._reset_constants()
+
+    def _reset_constants(self) -> None:
+        """
+        Recomputes the constant terms of the estimate from eta0, c and d. The table of
+        c / sqrt(d + count - 1), indexed by count - 1, is only filled on the next
+        estimate and doubles as needed.
+        """
+        self._d_eta0 = self._d * self._eta0
+        self._c_over_sqrt = np.empty(0)
+
+    def set_u_t_n(self, u: float, t: float, n_total: float) -> None:
+        super().set_u_t_n(u, t, n_total)
+        self._u_clip = u * (1 - self._eps)
+
+    def _c_over_sqrt_upto(self, count: int) -> np.ndarray:
+        """
+        Returns the table of c / sqrt(d + count - 1), grown to cover count if needed.
+        """
+        if count > self._c_over_sqrt.size:
+            size = max(2 * self._c_over_sqrt.size, count, 1024)
+            self._c_over_sqrt = self.c / np.sqrt(self.d + np.arange(size))
+        return self._c_over_sqrt
+
+    def estim_at(self, prev_sum: float, prev_var: float, count: int, m: float) -> float:
         """
         Calculate a shrinkage truncation estimate for the mean of a bounded,
         nonnegative data stream.
         """
         # Sum before the last data point
-        prev_sum = self.summaries.prev_sum
         if np.isnan(prev_sum):
             prev_sum = 0  # Zero for first samples
         # SD before the last data point
-        prev_sd = np.sqrt(self.summaries.prev_var)
+        prev_sd = np.sqrt(prev_var)
         if np.isnan(prev_sd) or prev_sd == 0:
             prev_sd = 1  # Replace with 1 if nan or zero, to avoid division by zero
-        # The remaining out-of-sample mean
-        m = self.summaries.oos_mean if np.isfinite(self.n_total) else self.t
-        count = self.summaries.count
         # Shrinkage estimate, shrunk towards eta0
-        shrunk = (self.d * self.eta0 + prev_sum) / (self.d + count - 1)
+        shrunk = (self._d_eta0 + prev_sum) / (self.d + count - 1)
         # Reshrunk shrinkage estimate, shrunk towards u
         reshrunked = (shrunk + self.u * self.f / prev_sd) / (1 + self.f / prev_sd)
         # Truncated reshrunk estimate
+        c_over_sqrt = self._c_over_sqrt_upto(count)[count - 1]
+        return min(self._u_clip, max(reshrunked, m + c_over_sqrt))
+
+    def estim_batch(
+        self,
+        prev_sums: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Calculate the shrinkage truncation estimates just after each of a batch of
+        observations, as in `estim_at` but on whole arrays.
+        """
+        prev_sums = np.where(np.isnan(prev_sums), 0, prev_sums)
+        prev_sd = np.sqrt(prev_vars)
+        prev_sd = np.where(np.isnan(prev_sd) | (prev_sd == 0), 1, prev_sd)
+        shrunk = (self._d_eta0 + prev_sums) / (self.d + counts - 1)
+        reshrunked = (shrunk + self.u * self.f / prev_sd) / (1 + self.f / prev_sd)
         return np.minimum(
-            self.u * (1 - np.finfo(float).eps),
-            np.maximum(reshrunked, m + self.c / np.sqrt(self.d + count - 1)),
+            self._u_clip,
+            np.maximum(
+                reshrunked,
+                m + self._c_over_sqrt_upto(np.max(counts, initial=0))[counts - 1],
+            ),
         )
 
 
 class Bet(ABC):
     """
     A base class for implementing bets for betting martingale tests on the mean
-    for non-negative, bounded random variables.
+    for non-negative, bounded random variables. Subclasses implement `bet_at`, or
+    override `bet` directly, in which case tests can only use them one observation at
+    a time.
     """
 
+    __slots__ = ("u", "t", "n_total", "_finite", "summaries")
+
     def __init__(self, n_total: int = np.inf, u: float = 1, t: float = 1 / 2):
         self.u = u
         self.t = t
         self.n_total = n_total
+        self._finite = bool(np.isfinite(n_total))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.bet_at, "__isabstractmethod__", False):
+            if cls.bet is Bet.bet:
+                raise TypeError(f"{cls.__name__} must implement bet_at or bet")
+            # Without bet_at there is no batch path, and tests take observations
+            # one at a time
+            cls.bet_at = None
 
-    @abstractmethod
     def bet(self) -> float:
         """
         Returns a 'bet': a fraction of the total remaining wealth.
         """
+        m = self.summaries.oos_mean if self._finite else self.t
+        return self.bet_at(
+            self.summaries.prev_mean,
+            self.summaries.prev_var,
+            self.summaries.count,
+            m,
+        )
+
+    @abstractmethod
+    def bet_at(self, prev_mean: float, prev_var: float, count: int, m: float) -> float:
+        """
+        Returns a bet, given the mean and variance of the data before the last
+        observation, the number of observations and the out-of-sample mean.
+        """
         pass
 
+    def bet_batch(
+        self,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Returns the bets just after each of a batch of observations, given the
+        arguments of `bet_at` for each observation as arrays.
+        """
+        return np.array(
+            [self.bet_at(*stats) for stats in zip(prev_means, prev_vars, counts, m)],
+            dtype=float,
+        )
+
+    def oos_means(self, k: int) -> np.ndarray:
+        """
+        Returns the out-of-sample means used by the bet just after each of the last k
+        observations.
+        """
+        if self._finite:
+            return self.summaries.hist_oos_means[self.summaries.count - k + 1 :]
+        return np.full(k, float(self.t))
+
     def set_u_t_n(self, u: float, t: float, n_total: float) -> None:
         self.u = u
         self.t = t
         self.n_total = n_total
+        self._finite = bool(np.isfinite(n_total))
 
     def override_summaries(
         self, summaries: RunningSummaries | FPRunningSummaries
@@ -120,16 +325,32 @@ class Bet(ABC):
 
 
 class FixedBet(Bet):
+    __slots__ = ("lam",)
 
     def __init__(self, lam: float = 0.5):
-        # We don't need super().__init__(...) here, bet just returns a constant.
+        # The population arguments are left at their defaults, bet just returns a
+        # constant.
+        super().__init__()
         self.lam = lam
 
     def bet(self) -> float:
         return self.lam
 
+    def bet_at(self, prev_mean: float, prev_var: float, count: int, m: float) -> float:
+        return self.lam
+
+    def bet_batch(
+        self,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        return np.full(len(counts), float(self.lam))
+
 
 class AGRAPA(Bet):
+    __slots__ = ("lam0", "c0", "c_max", "c_grow")
 
     def __init__(
         self,
@@ -142,7 +363,7 @@ class AGRAPA(Bet):
         c_grow: float = 0,
     ):
         super().__init__(n_total, u, t)
-        if np.isfinite(n_total):
+        if self._finite:
             self.summaries = FPRunningSummaries(n_total, t)
         else:
             self.summaries = RunningSummaries()
@@ -151,19 +372,79 @@ class AGRAPA(Bet):
         self.c_max = c_max
         self.c_grow = c_grow
 
-    def bet(self) -> float:
-        # mean before the last data pont
-        prev_mean = self.summaries.prev_mean
-        # var before the last data point
-        prev_var = self.summaries.prev_var
-        m = self.summaries.oos_mean if np.isfinite(self.n_total) else self.t
+    def bet_at(self, prev_mean: float, prev_var: float, count: int, m: float) -> float:
         lam = (prev_mean - m) / (prev_var + (prev_mean - m) ** 2)
         if np.isnan(lam):
             lam = self.lam0
         c = self.c0 + (self.c_max - self.c_grow) * (
-            1 - 1 / (1 + self.c_grow * np.sqrt(self.summaries.count))
+            1 - 1 / (1 + self.c_grow * np.sqrt(count))
         )
-        return np.maximum(0, np.minimum(c / m, lam))
+        return max(0.0, min(c / m, lam))
+
+
+@njit(cache=True, error_model="numpy")
+def _alpha_mart_kernel(
+    x,
+    counts,
+    prev_sums,
+    prev_vars,
+    m,
+    m_est,
+    u,
+    u_est,
+    eta0,
+    c,
+    d,
+    f,
+    atol,
+    rtol,
+    log_e0,
+    p0,
+):
+    """
+    The ALPHA martingale with a ShrinkTrunc estimator, fused into a single loop over
+    the observations x. The running summaries just after each observation (counts,
+    previous sums and variances, out-of-sample means m as seen by the test and m_est
+    as seen by the estimator) are given as arrays. log_e0 and p0 are the log of the
+    e-process and the p-value before x was observed. Returns the eta estimates,
+    e-values, log e-process and p-values for each observation.
+    """
+    k = x.size
+    eta = np.empty(k)
+    e = np.empty(k)
+    log_e_process = np.empty(k)
+    p = np.empty(k)
+    u_clip = u_est * (1 - np.finfo(np.float64).eps)
+    for i in range(k):
+        # ShrinkTrunc.estim
+        prev_sum = prev_sums[i]
+        if np.isnan(prev_sum):
+            prev_sum = 0.0
+        prev_sd = np.sqrt(prev_vars[i])
+        if np.isnan(prev_sd) or prev_sd == 0:
+            prev_sd = 1.0
+        shrunk = (d * eta0 + prev_sum) / (d + counts[i] - 1)
+        reshrunked = (shrunk + u_est * f / prev_sd) / (1 + f / prev_sd)
+        eta[i] = np.minimum(
+            u_clip, np.maximum(reshrunked, m_est[i] + c / np.sqrt(d + counts[i] - 1))
+        )
+        # e-value of x[i], as in AlphaMart.update
+        mi = m[i]
+        if mi > u:
+            e[i] = 0.0
+        elif mi < 0:
+            e[i] = np.inf
+        elif abs(mi) <= atol + 1e-5 * abs(mi) or abs(u - mi) <= atol + rtol * abs(mi):
+            e[i] = 1.0
+        else:
+            e[i] = (x[i] * eta[i] / mi + (u - x[i]) * (u - eta[i]) / (u - mi)) / u
+        log_e0 += np.log(e[i])
+        log_e_process[i] = log_e0
+        pi = np.exp(-log_e0)
+        if pi < p0:
+            p0 = pi
+        p[i] = p0
+    return eta, e, log_e_process, p
 
 
 class NonNegMeanTest(SeqHypothesisTest):
@@ -173,6 +454,8 @@ class NonNegMeanTest(SeqHypothesisTest):
     0 < t < u.
     """
 
+    __slots__ = ("u", "t", "summaries")
+
     def __init__(
         self,
         alpha: float = 0.05,
@@ -188,12 +471,35 @@ class NonNegMeanTest(SeqHypothesisTest):
         else:
             self.summaries = RunningSummaries()
 
+    def reset(self) -> None:
+        super().reset()
+        if self.finite:
+            self.summaries = FPRunningSummaries(self.n_total, self.t)
+        else:
+            self.summaries = RunningSummaries()
+
 
 class AlphaMart(NonNegMeanTest):
     """
     The ALPHA martingale.
     """
 
+    __slots__ = (
+        "estim",
+        "_eta_fn",
+        "_eta_one_fn",
+        "_update_batch",
+        "atol",
+        "rtol",
+        "_len",
+        "_eta_buf",
+        "_e_buf",
+        "_log_e_buf",
+        "_p_buf",
+        "_e_process_buf",
+        "_e_process_len",
+    )
+
     def __init__(
         self,
         alpha: float = 0.05,
@@ -210,58 +516,330 @@ class AlphaMart(NonNegMeanTest):
         else:
             self.estim = ShrinkTrunc(u, t, n_total)
         self.estim.override_summaries(self.summaries)
+        # How eta is found from the summaries, fixed by the type of estimator. Without
+        # estim_at or bet_at, there is no batch path and observations are taken one
+        # at a time.
+        if isinstance(self.estim, Estimator):
+            self._eta_fn = self._estim_eta
+            self._eta_one_fn = self._estim_eta_one
+            if type(self.estim).estim_at is None:
+                self._eta_fn = None
+        else:
+            self._eta_fn = self._bet_eta
+            self._eta_one_fn = self._bet_eta_one
+            if type(self.estim).bet_at is None:
+                self._eta_fn = None
+        # ShrinkTrunc batches run in the compiled kernel when numba is available
+        if HAS_NUMBA and type(self.estim) is ShrinkTrunc:
+            self._update_batch = self._update_jit
+        else:
+            self._update_batch = self._update_numpy
         self.atol = atol
         self.rtol = rtol
-        self._eta_history = []
-        self.e_hist = []
-        self.e_process = []
-        self.p_history = []
+        self._init_histories()
+
+    def _init_histories(self) -> None:
+        """
+        Allocates empty histories. They are kept in buffers whose first `_len`
+        entries are in use, and which double in size when full.
+        """
+        self._len = 0
+        self._eta_buf = np.empty(1024)
+        self._e_buf = np.empty(1024)
+        self._log_e_buf = np.empty(1024)
+        self._p_buf = np.empty(1024)
+        # The e-process is found from the log e-process when first asked for, and
+        # only for observations added since it was last asked for
+        self._e_process_buf = np.empty(1024)
+        self._e_process_len = 0
+
+    @property
+    def _eta_history(self) -> np.ndarray:
+        """
+        The estimates of the mean used for each observation.
+        """
+        return self._eta_buf[: self._len]
+
+    @property
+    def e_hist(self) -> np.ndarray:
+        """
+        The e-value of each observation.
+        """
+        return self._e_buf[: self._len]
+
+    @property
+    def _log_e_process(self) -> np.ndarray:
+        """
+        The log of the e-process after each observation.
+        """
+        return self._log_e_buf[: self._len]
+
+    @property
+    def p_history(self) -> np.ndarray:
+        """
+        The p-value after each observation.
+        """
+        return self._p_buf[: self._len]
+
+    @property
+    def e_process(self) -> np.ndarray:
+        """
+        The e-process after each observation. It is accumulated in log-space, which
+        avoids overflow and underflow over long streams.
+        """
+        i, n = self._e_process_len, self._len
+        if i < n:
+            with np.errstate(over="ignore"):
+                np.exp(self._log_e_buf[i:n], out=self._e_process_buf[i:n])
+            self._e_process_len = n
+        return self._e_process_buf[:n]
 
     @property
     def pval(self) -> float:
-        return self.p_history[-1] if self.p_history else np.nan
+        return self._p_buf[self._len - 1] if self._len else np.nan
+
+    def reset(self) -> None:
+        super().reset()
+        self.estim.override_summaries(self.summaries)
+        self._init_histories()
 
     def update(self, x: list[float]) -> None:
         super().update(x)
-        # Loop through them and calculate p-values one at a time.
-        for xi in x:
-            # Update summaries
-            self.summaries.add([xi])
-            # Compute out-of-sample mean
-            m = self.summaries.oos_mean if self.finite else self.t
-            # Estimate eta
-            if isinstance(self.estim, Estimator):
-                eta = self.estim.estim()  # Do not pass x to avoid updating twice
-            elif isinstance(self.estim, Bet):
-                eta = bet_to_estimate(self.estim.bet(), m, self.u)
-            self._eta_history.append(eta)
-            # compute e-value of sample xi
-            if m > self.u:
-                e_i = 0  # True mean certainly less than hypothesised
-            elif m < 0:
-                e_i = np.inf  # True mean certainly greater than hypothesised
-            elif np.isclose(0, m, atol=self.atol) or np.isclose(
-                self.u, m, atol=self.atol, rtol=self.rtol
-            ):
-                e_i = 1  # Ignore
-            else:
-                e_i = (
-                    xi * eta / m + (self.u - xi) * (self.u - eta) / (self.u - m)
-                ) / self.u
-            self.e_hist.append(e_i)
-
-            # Add to e_process (in this case it is just the cumulative product
-            # of e-values)
-            self.e_process.append(e_i * self.e_process[-1] if self.e_process else e_i)
-
-            # Compute p-value and add to history: p is the smallest 1/e seen so far
-            p = min(
-                1, self.pval if not np.isnan(self.pval) else 1, 1 / self.e_process[-1]
-            )
-            self.p_history.append(p)
+        x = np.array(x, dtype=float, ndmin=1)
+        k = len(x)
+        if k == 1 or self._eta_fn is None:
+            for xi in x.tolist():
+                self._update_one(xi)
+            return self._decide()
+        # Update summaries once for the whole batch, then read off the summaries just
+        # after each observation
+        self.summaries.add(x)
+        n = self.summaries.count
+        counts = np.arange(n - k + 1, n + 1)
+        prev_sums, prev_means, prev_vars = self.summaries.prev_history(k)
+        # Out-of-sample means
+        if self.finite:
+            m = self.summaries.hist_oos_means[n - k + 1 :]
+        else:
+            m = np.full(k, float(self.t))
+        self._update_batch(x, counts, prev_sums, prev_means, prev_vars, m)
+        return self._decide()
 
-        if self.p_history[-1] < self.alpha:
+    def _decide(self) -> Decision:
+        """
+        Sets the decision from the latest p-value.
+        """
+        if self.pval < self.alpha:
             self.decision = Decision.REJECT
+            self.stopped = True
         else:
             self.decision = Decision.CONTINUE
+            self.stopped = False
         return self.decision
+
+    def _update_one(self, xi: float) -> None:
+        """
+        Updates the summaries and histories for a single observation using scalar
+        arithmetic, which is much cheaper than the array operations of the batch path
+        for a batch of one.
+        """
+        self.summaries.add(xi)
+        m = self.summaries.oos_mean if self.finite else self.t
+        eta = self._eta_one_fn(m)
+        # e-value of xi, as in `_extend_process`
+        u = self.u
+        if m > u:
+            e = 0.0  # True mean certainly less than hypothesised
+        elif m < 0:
+            e = math.inf  # True mean certainly greater than hypothesised
+        elif abs(m) <= self.atol + 1e-5 * abs(m) or abs(u - m) <= (
+            self.atol + self.rtol * abs(m)
+        ):
+            e = 1.0  # Ignore
+        else:
+            e = (xi * eta / m + (u - xi) * (u - eta) / (u - m)) / u
+        i = self._len
+        log_e = self._log_e_buf[i - 1] if i else 0.0
+        if e > 0:
+            log_e += math.log(e)
+        elif e == 0:
+            log_e -= math.inf
+        else:
+            log_e = math.nan
+        # p is the smallest 1/e seen so far, and never more than 1
+        p = self._p_buf[i - 1] if i else 1.0
+        if log_e > 0:
+            p = min(p, math.exp(-log_e))
+        self._grow(1)
+        self._eta_buf[i] = eta
+        self._e_buf[i] = e
+        self._log_e_buf[i] = log_e
+        self._p_buf[i] = p
+        self._len = i + 1
+
+    def _estim_eta_one(self, m: float) -> float:
+        """
+        Estimates eta for a single observation with an Estimator.
+        """
+        return self.estim.estim()
+
+    def _bet_eta_one(self, m: float) -> float:
+        """
+        Converts the bet for a single observation into an estimate of eta.
+        """
+        return bet_to_estimate(self.estim.bet(), m, self.u)
+
+    def _estim_eta(
+        self,
+        prev_sums: np.ndarray,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Estimates eta for a batch of observations with an Estimator.
+        """
+        return self.estim.estim_batch(
+            prev_sums, prev_vars, counts, self.estim.oos_means(len(counts))
+        )
+
+    def _bet_eta(
+        self,
+        prev_sums: np.ndarray,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        counts: np.ndarray,
+        m: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Converts the bets for a batch of observations into estimates of eta.
+        """
+        lam = self.estim.bet_batch(
+            prev_means, prev_vars, counts, self.estim.oos_means(len(counts))
+        )
+        return bet_to_estimate(lam, m, self.u)
+
+    def _update_numpy(
+        self,
+        x: np.ndarray,
+        counts: np.ndarray,
+        prev_sums: np.ndarray,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        m: np.ndarray,
+    ) -> None:
+        """
+        Updates the histories for the observations x with array operations, given the
+        summaries just after each observation.
+        """
+        eta = self._eta_fn(prev_sums, prev_means, prev_vars, counts, m)
+        self._extend_process(x, m, eta)
+
+    def _update_jit(
+        self,
+        x: np.ndarray,
+        counts: np.ndarray,
+        prev_sums: np.ndarray,
+        prev_means: np.ndarray,
+        prev_vars: np.ndarray,
+        m: np.ndarray,
+    ) -> None:
+        """
+        Updates the histories for the observations x in the compiled kernel, given the
+        summaries just after each observation. Only used for ShrinkTrunc estimators.
+        """
+        eta, e, log_e_process, p = _alpha_mart_kernel(
+            x,
+            counts,
+            prev_sums,
+            prev_vars,
+            m,
+            self.estim.oos_means(len(x)),
+            float(self.u),
+            float(self.estim.u),
+            float(self.estim.eta0),
+            float(self.estim.c),
+            float(self.estim.d),
+            float(self.estim.f),
+            float(self.atol),
+            float(self.rtol),
+            self._log_e_buf[self._len - 1] if self._len else 0.0,
+            1.0 if np.isnan(self.pval) else float(self.pval),
+        )
+        self._extend_histories(eta, e, log_e_process, p)
+
+    def _extend_process(self, x: np.ndarray, m: np.ndarray, eta: np.ndarray) -> None:
+        """
+        Computes the e-values, e-process and p-values for the observations x, given
+        the out-of-sample means m and estimates eta just after each observation, and
+        adds them to the histories along with eta.
+        """
+        u = self.u
+        with np.errstate(divide="ignore", invalid="ignore"):
+            e = (x * eta / m + (u - x) * (u - eta) / (u - m)) / u
+        # Ignore samples where m is close to 0 or u, with the tolerances of np.isclose
+        abs_m = np.abs(m)
+        close = (abs_m <= self.atol + 1e-5 * abs_m) | (
+            np.abs(u - m) <= self.atol + self.rtol * abs_m
+        )
+        e = np.where(close, 1.0, e)
+        e = np.where(m < 0, np.inf, e)  # True mean certainly greater than hypothesised
+        e = np.where(m > u, 0.0, e)  # True mean certainly less than hypothesised
+
+        # The e-process is the cumulative product of e-values, so its log is the
+        # cumulative sum of log e-values, continued from the last value. p is the
+        # smallest 1/e seen so far, i.e. exp(-(largest log e seen so far)).
+        log_e0 = self._log_e_buf[self._len - 1] if self._len else 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_e_process = np.cumsum(np.concatenate(([log_e0], np.log(e))))[1:]
+        p0 = 1.0 if np.isnan(self.pval) else self.pval
+        with np.errstate(divide="ignore"):
+            # NaN log e-values, from an undefined out-of-sample mean, are skipped,
+            # as in the compiled kernel
+            max_log_e = np.fmax.accumulate(
+                np.concatenate(([-np.log(p0)], log_e_process))
+            )[1:]
+        self._extend_histories(eta, e, log_e_process, np.exp(-max_log_e))
+
+    def _grow(self, k: int) -> None:
+        """
+        Grows the history buffers if needed, so that they can hold k more
+        observations.
+        """
+        if self._len + k > self._p_buf.size:
+            (
+                self._eta_buf,
+                self._e_buf,
+                self._log_e_buf,
+                self._p_buf,
+                self._e_process_buf,
+            ) = grow_buffers(
+                self._len,
+                k,
+                self._eta_buf,
+                self._e_buf,
+                self._log_e_buf,
+                self._p_buf,
+                self._e_process_buf,
+            )
+
+    def _extend_histories(
+        self,
+        eta: np.ndarray,
+        e: np.ndarray,
+        log_e_process: np.ndarray,
+        p: np.ndarray,
+    ) -> None:
+        """
+        Adds the estimates, e-values, log e-process and p-values for a batch of
+        observations to the histories.
+        """
+        k = len(eta)
+        self._grow(k)
+        i = self._len
+        self._eta_buf[i : i + k] = eta
+        self._e_buf[i : i + k] = e
+        self._log_e_buf[i : i + k] = log_e_process
+        self._p_buf[i : i + k] = p
+        self._len = i + k
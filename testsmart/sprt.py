@@ -6,6 +6,7 @@ This file implements Wald's Sequential Probability Ratio Test using the
 from abc import ABC, abstractmethod
 
 from testsmart.hypothesis import SeqHypothesisTest, Decision
+from testsmart.utils import HAS_NUMBA, grow_buffers, njit, prange
 
 import numpy as np
 
@@ -16,13 +17,28 @@ class LogLikelihood(ABC):
     """
 
     @abstractmethod
-    def ll(self, x: np.ndarray, theta: np.floating):
+    def ll(self, x: np.ndarray, theta: float):
         """
         Log-likelihood ratio for the simple-vs-simple hypothesis test defined
         by theta0 and theta1.
         """
         pass
 
+    def llr(self, x: np.ndarray, theta0: float, theta1: float):
+        """
+        The log-likelihood ratio of theta0 to theta1 for each observation in x.
+        Subclasses may override this with a closed form which avoids evaluating
+        the log-likelihood twice.
+        """
+        return self.ll(x, theta0) - self.ll(x, theta1)
+
+    def affine_llr(self, theta0: float, theta1: float) -> tuple[float, float] | None:
+        """
+        If the log-likelihood ratio of theta0 to theta1 is affine in x, returns the
+        coefficients (c, k) such that llr(x) = c + k * x. Otherwise returns None.
+        """
+        return None
+
     @abstractmethod
     def __repr__(self):
         """
@@ -37,9 +53,15 @@ class ExponentialLogLikelihood(LogLikelihood):
     Implements the likelihood function for exponential distributions.
     """
 
-    def ll(self, x: np.ndarray, theta: np.floating):
+    def ll(self, x: np.ndarray, theta: float):
         return np.log(theta) - x * theta
 
+    def llr(self, x: np.ndarray, theta0: float, theta1: float):
+        return x * (theta1 - theta0) + np.log(theta0 / theta1)
+
+    def affine_llr(self, theta0: float, theta1: float):
+        return float(np.log(theta0 / theta1)), float(theta1 - theta0)
+
     def __repr__(self):
         return "<Exponential(theta) log-Likelihood>"
 
@@ -50,18 +72,63 @@ class NormalLogLikelihood(LogLikelihood):
     scale parameter sigma.
     """
 
-    def __init__(self, sigma: np.floating = 1):
-        self.sigma = sigma
+    def __init__(self, sigma: float = 1):
+        self.sigma = float(sigma)
 
-    def ll(self, x: np.ndarray, theta: np.floating):
+    def ll(self, x: np.ndarray, theta: float):
         # fmt: off
         return (x - theta) ** 2 / (2 * self.sigma**2)
         # fmt: on
 
+    def llr(self, x: np.ndarray, theta0: float, theta1: float):
+        # (x - theta0)^2 - (x - theta1)^2 is linear in x
+        return (2 * (theta1 - theta0) * x + (theta0**2 - theta1**2)) / (
+            2 * self.sigma**2
+        )
+
+    def affine_llr(self, theta0: float, theta1: float):
+        return (
+            float((theta0**2 - theta1**2) / (2 * self.sigma**2)),
+            float((theta1 - theta0) / self.sigma**2),
+        )
+
     def __repr__(self):
         return f"<Normal(theta, {self.sigma}) log-Likelihood>"
 
 
+@njit(cache=True)
+def _sprt_step(x, out, s_prev, a, b, c, k):
+    """
+    Accumulates the log-likelihood ratios c + k * x onto the partial sum s_prev,
+    writing the partial sums into out and stopping at the first partial sum outside
+    of (a, b). Returns the number of partial sums which were computed.
+    """
+    s = s_prev
+    for i in range(x.size):
+        s += c + k * x[i]
+        out[i] = s
+        if s <= a or s >= b:
+            return i + 1
+    return x.size
+
+
+@njit(parallel=True, cache=True)
+def _sprt_batch(x, a, b, c, k, n, s_out):
+    """
+    Runs _sprt_step on each row of x in parallel, writing the number of observations
+    used into n and the final partial sum into s_out.
+    """
+    for i in prange(x.shape[0]):
+        s = 0.0
+        n[i] = x.shape[1]
+        for j in range(x.shape[1]):
+            s += c + k * x[i, j]
+            if s <= a or s >= b:
+                n[i] = j + 1
+                break
+        s_out[i] = s
+
+
 class SPRT(SeqHypothesisTest):
     """
     Wald's Sequential Probability Ratio Test for testing the simple hypothesis
@@ -72,6 +139,10 @@ class SPRT(SeqHypothesisTest):
     for the Exponential scale and Normal location parameters. When testing the Normal
     mean, you may optionally specify the standard deviation `sigma` during
     construction.  If left unspecified, it is assumed to be 1.
+
+    When a batch of observations is passed to `update`, the test stops at the first
+    observation where the partial sum leaves (a, b); any remaining observations in
+    the batch are discarded.
     """
 
     def __init__(
@@ -85,28 +156,137 @@ class SPRT(SeqHypothesisTest):
     ):
         super().__init__(alpha, n_total=np.inf)
         self.beta = beta
-        self.theta0 = theta0
-        self.theta1 = theta1
-        self.a = np.log(beta / (1 - alpha))
-        self.b = np.log((1 - alpha) / beta)
-        self.S = [0]
+        self.theta0 = float(theta0)
+        self.theta1 = float(theta1)
+        self.a = float(np.log(beta / (1 - alpha)))
+        self.b = float(np.log((1 - alpha) / beta))
+        # The partial sums are stored in a buffer which doubles in size when full.
+        self._S_buf = np.zeros(64)
+        self._S_len = 1
+        self._S_last = 0.0
         self.loglikelihood = loglikelihood
+        # Coefficients (c, k) of the log-likelihood ratio c + k * x, if it is affine
+        self._affine = loglikelihood.affine_llr(self.theta0, self.theta1)
+        # The log-likelihood ratio and the partial sum scan are chosen once, here.
+        if self._affine is not None:
+            self.llr = self._affine_llr
+        else:
+            self.llr = self._loglikelihood_llr
+        if HAS_NUMBA and self._affine is not None:
+            self._scan = self._scan_jit
+        else:
+            self._scan = self._scan_numpy
+
+    @property
+    def S(self) -> np.ndarray:
+        """
+        The partial sums of the log-likelihood ratios, starting from zero. The array
+        is a read-only view of the internal buffer.
+        """
+        S = self._S_buf[: self._S_len]
+        S.flags.writeable = False
+        return S
+
+    def _affine_llr(self, x: np.ndarray) -> np.ndarray:
+        """
+        The log-likelihood ratios of x, from the coefficients of an affine ratio.
+        """
+        c, k = self._affine
+        return c + k * x
+
+    def _loglikelihood_llr(self, x: np.ndarray) -> np.ndarray:
+        """
+        The log-likelihood ratios of x, from the log-likelihood.
+        """
+        return self.loglikelihood.llr(x, self.theta0, self.theta1)
+
+    def _reserve(self, n: int) -> None:
+        """
+        Grows the partial sum buffer if needed, so that it can hold n more values.
+        """
+        if self._S_len + n > self._S_buf.size:
+            (self._S_buf,) = grow_buffers(self._S_len, n, self._S_buf)
+
+    def _scan_jit(self, x: np.ndarray, out: np.ndarray) -> int:
+        """
+        Writes the partial sums for x into out using the compiled kernel, stopping
+        at the first one outside of (a, b). Returns the number of values written.
+        """
+        return _sprt_step(x, out, self._S_last, self.a, self.b, *self._affine)
+
+    def _scan_numpy(self, x: np.ndarray, out: np.ndarray) -> int:
+        """
+        Writes the partial sums for x into out using NumPy, and returns the number of
+        values up to and including the first one outside of (a, b).
+        """
+        # The ratios are written straight into out and summed in place there, so
+        # no temporary arrays are needed for affine log-likelihood ratios.
+        if self._affine is None:
+            out[:] = self.llr(x)
+        else:
+            c, k = self._affine
+            np.multiply(x, k, out=out)
+            out += c
+        np.add.accumulate(out, out=out)
+        out += self._S_last
+        crossed = np.flatnonzero((out <= self.a) | (out >= self.b))
+        return crossed[0] + 1 if crossed.size else len(x)
+
+    def reset(self) -> None:
+        super().reset()
+        # A new buffer, so that earlier views of the partial sums are left intact
+        self._S_buf = np.zeros(64)
+        self._S_len = 1
+        self._S_last = 0.0
 
     def update(self, x: list[float]) -> Decision:
-        super().update(x)
-        self.S.extend(
-            np.cumsum(
-                self.loglikelihood.ll(np.array(x), self.theta0)
-                - self.loglikelihood.ll(np.array(x), self.theta1)
-            )
-            + self.S[-1]
-        )
-        if self.S[-1] <= self.a:
+        # Single observations skip the array operations
+        if isinstance(x, (float, int, np.number)):
+            return self.update_scalar(x)
+        if isinstance(x, np.ndarray):
+            if x.size == 1:
+                return self.update_scalar(x.item())
+        elif len(x) == 1 and isinstance(x[0], (float, int, np.number)):
+            return self.update_scalar(x[0])
+        x = np.array(x, dtype=float, ndmin=1).ravel()
+        self._reserve(len(x))
+        n = self._scan(x, self._S_buf[self._S_len : self._S_len + len(x)])
+        super().update(x[:n])
+        self._S_len += n
+        self._S_last = float(self._S_buf[self._S_len - 1])
+        return self._decide()
+
+    def update_scalar(self, xi: float) -> Decision:
+        """
+        Updates the test with a single observation. This is equivalent to
+        `update([xi])`, but avoids any array operations.
+
+        :param xi: The observation.
+        :type xi: float
+        :return: The resulting decision.
+        :rtype: Decision
+        """
+        xi = float(xi)
+        self._S_last += float(self.llr(xi))
+        self._reserve(1)
+        self._S_buf[self._S_len] = self._S_last
+        self._S_len += 1
+        self._observe_scalar(xi)
+        return self._decide()
+
+    def _decide(self) -> Decision:
+        """
+        Sets the decision from the latest partial sum.
+        """
+        if self._S_last <= self.a:
             self.decision = Decision.ACCEPT
-        elif self.S[-1] >= self.b:
+            self.stopped = True
+        elif self._S_last >= self.b:
             self.decision = Decision.REJECT
+            self.stopped = True
         else:
             self.decision = Decision.CONTINUE
+            self.stopped = False
         return self.decision
 
     def summary(self):
@@ -115,5 +295,39 @@ class SPRT(SeqHypothesisTest):
             "alternative": f"theta = {self.theta1}",
             "loglikelihood": self.loglikelihood,
             "decision": self.decision,
-            "n": len(self.observations),
+            "n": self._n_obs,
         }
+
+
+def sprt_batch(sprt: SPRT, x: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Runs independent copies of a new SPRT on each row of x, for example to simulate
+    the distribution of its stopping time. The test `sprt` is only used for its
+    parameters, and is not updated.
+
+    :param sprt: The test to run; any observations it has already taken are ignored.
+    :type sprt: SPRT
+    :param x: A (trials, observations) array, one row of observations per trial.
+    :type x: numpy.ndarray
+    :return: The decision for each trial, the number of observations used by each
+             trial, and the final partial sum of each trial.
+    :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+    """
+    x = np.array(x, dtype=float, ndmin=2)
+    if HAS_NUMBA and sprt._affine is not None:
+        n = np.empty(x.shape[0], dtype=np.int64)
+        S = np.empty(x.shape[0])
+        _sprt_batch(x, sprt.a, sprt.b, *sprt._affine, n, S)
+    elif x.shape[1] == 0:
+        # No observations, so every trial stays at the starting partial sum of zero
+        n = np.zeros(x.shape[0], dtype=np.int64)
+        S = np.zeros(x.shape[0])
+    else:
+        partial_sums = np.cumsum(sprt.llr(x), axis=1)
+        crossed = (partial_sums <= sprt.a) | (partial_sums >= sprt.b)
+        n = np.where(crossed.any(axis=1), crossed.argmax(axis=1) + 1, x.shape[1])
+        S = partial_sums[np.arange(x.shape[0]), n - 1]
+    decisions = np.full(x.shape[0], Decision.CONTINUE, dtype=object)
+    decisions[S <= sprt.a] = Decision.ACCEPT
+    decisions[S >= sprt.b] = Decision.REJECT
+    return decisions, n, S
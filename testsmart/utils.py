@@ -1,5 +1,27 @@
 import numpy as np
 
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:  # pragma: no cover
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """
+        Stand-in for `numba.njit` when numba is not installed: functions are left
+        as plain Python.
+        """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+    prange = range
+
+
+# Machine epsilon, for judging rounding error
+_EPS = np.finfo(float).eps
+
 
 class TooManySamplesError(Exception):
     """
@@ -15,6 +37,37 @@ class TooManySamplesError(Exception):
         )
 
 
+def _welford_combine(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """
+    Combines the counts, means and sums of squared deviations from the mean of two
+    samples A and B into those of the joint sample, as in Chan et al. (1979). Works
+    elementwise on arrays.
+    """
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta**2 * n_a * n_b / n
+    return n, mean, m2
+
+
+def grow_buffers(length: int, k: int, *buffers: np.ndarray) -> list[np.ndarray]:
+    """
+    Grows arrays whose first `length` entries are in use, so that they can hold k
+    more entries. An array that is too small is replaced by a copy with at least
+    double the capacity, so that appending costs amortised constant time. Callers
+    on hot paths check the capacity themselves first, to skip the call.
+
+    :param length: The number of entries in use.
+    :param k: The number of entries to make room for.
+    :param buffers: The arrays to grow.
+    :return: The arrays, or larger copies of them where they were too small.
+    """
+    return [
+        buf if length + k <= buf.size else np.resize(buf, max(2 * buf.size, length + k))
+        for buf in buffers
+    ]
+
+
 class RunningSummaries:
     """
     A class for calculating some summaries of a stream of data:
@@ -22,79 +75,90 @@ class RunningSummaries:
       2. cumulative sum,
       3. running mean (Welford's algorithm),
       4. running (population) variance (Welford's algorithm),
-    These summaries are useful for a variety of inferential tasks.
+    These summaries are useful for a variety of inferential tasks. The data
+    themselves are only stored if `keep_data` is set.
     """
 
-    def __init__(self):
-        self._data = []
+    __slots__ = (
+        "_count",
+        "_data",
+        "_sums",
+        "_means",
+        "_vars",
+        "prev_sum",
+        "prev_mean",
+        "prev_var",
+    )
+
+    #: The previous sum of the data stream, i.e. at the second-to-last time point.
+    prev_sum: float
+    #: The previous mean of the data stream, i.e. at the second-to-last time point.
+    prev_mean: float
+    #: The previous variance of the data stream, i.e. at the second-to-last time point.
+    prev_var: float
+
+    def __init__(self, keep_data: bool = False):
+        # Each summary is kept in a buffer whose first `count` entries are in use. The
+        # buffers double in size when full.
         self._count = 0
-        self._sums = []
-        self._means = []
-        self._vars = []
+        self._data = np.empty(16) if keep_data else None
+        self._sums = np.empty(16)
+        self._means = np.empty(16)
+        self._vars = np.empty(16)
+        self.prev_sum = 0
+        self.prev_mean = np.nan
+        self.prev_var = np.nan
 
     @property
-    def hist_sums(self) -> list[float]:
+    def hist_data(self) -> np.ndarray | None:
         """
-        The historical sums of the data stream, up to the current time point.
+        The data stream, up to the current time point, or None if the data are not
+        kept.
         """
-        return self._sums
+        return None if self._data is None else self._data[: self._count]
 
     @property
-    def prev_sum(self) -> float:
+    def hist_sums(self) -> np.ndarray:
         """
-        The previous sum of the data stream, i.e. at the second-to-last time point.
+        The historical sums of the data stream, up to the current time point.
         """
-        return self._sums[-2] if len(self._sums) > 1 else 0
+        return self._sums[: self._count]
 
     @property
     def sum(self) -> float:
         """
         The current total sum of the data stream.
         """
-        return self._sums[-1] if self._sums else 0
+        return self._sums[self._count - 1] if self._count else 0
 
     @property
-    def hist_means(self) -> list[float]:
+    def hist_means(self) -> np.ndarray:
         """
         The historical running mean of the data stream, up to the current time.
         """
-        return self._means
-
-    @property
-    def prev_mean(self) -> float:
-        """
-        The previous mean of the data stream, i.e. at the second-to-last time point.
-        """
-        return self._means[-2] if len(self._means) > 1 else np.nan
+        return self._means[: self._count]
 
     @property
     def mean(self) -> float:
         """
         The current mean of the data stream.
         """
-        return self._means[-1] if self._means else np.nan
+        return self._means[self._count - 1] if self._count else np.nan
 
     @property
-    def hist_vars(self) -> list[float]:
+    def hist_vars(self) -> np.ndarray:
         """
         The historical running (population) variance of the data stream, up to the
         current time.
         """
-        return self._vars
-
-    @property
-    def prev_var(self) -> float:
-        """
-        The previous variance of the data stream, i.e. at the second-to-last time point.
-        """
-        return self._vars[-2] if len(self._vars) > 1 else np.nan
+        return self._vars[: self._count]
 
     @property
     def var(self) -> float:
         """
         The current (population) variance of the data stream.
         """
-        return self._vars[-1] if self._vars else np.nan
+        return self._vars[self._count - 1] if self._count else np.nan
 
     @property
     def count(self) -> int:
@@ -103,29 +167,108 @@ class RunningSummaries:
         """
         return self._count
 
-    def add(self, x: list[float]) -> None:
-        if self.count == 0:
-            # Starting values
-            self._data.append(x[0])
-            self._count = 1
-            self._sums.append(x[0])
-            self._means.append(x[0])
-            self._vars.append(0)
-            x = x[1:]
-        for xn in x:
-            # Updates
-            self._data.append(xn)
-            # Increment counter
-            self._count = self._count + 1
-            # Add to cumulative sum
-            self._sums.append(self.sum + xn)
-            # Welford's online running mean and (population) variance
-            self._means.append(self.sum / self.count)
-            self._vars.append(
-                self.var
-                + ((xn - self._means[-2]) * (xn - self._means[-1]) - self.var)
-                / self.count
+    def prev_history(self, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The values that `prev_sum`, `prev_mean` and `prev_var` took just after each of
+        the last k observations was added.
+        """
+        hi = max(self._count - 1, 0)
+        lo = max(hi - k, 0)
+        pad = k - (hi - lo)
+        return (
+            np.concatenate([np.zeros(pad), self._sums[lo:hi]]),
+            np.concatenate([np.full(pad, np.nan), self._means[lo:hi]]),
+            np.concatenate([np.full(pad, np.nan), self._vars[lo:hi]]),
+        )
+
+    def _ensure(self, k: int) -> None:
+        """
+        Grows the buffers if needed, so that they can hold k more observations.
+        """
+        n = self._count
+        if n + k > self._sums.size:
+            self._sums, self._means, self._vars = grow_buffers(
+                n, k, self._sums, self._means, self._vars
             )
+            if self._data is not None:
+                (self._data,) = grow_buffers(n, k, self._data)
+
+    def _add_one(self, xn: float) -> None:
+        """
+        Adds a single observation using Welford's recurrences on local scalars, which
+        is much cheaper than the array operations in `add` for a batch of one.
+        """
+        self._ensure(1)
+        n = self._count
+        if n:
+            s = self._sums[n - 1] + xn
+            m = self._means[n - 1]
+            m2 = self._vars[n - 1] * n
+            n += 1
+            d1 = xn - m
+            m += d1 / n
+            m2 += d1 * (xn - m)
+            if m2 <= n * (2 * _EPS * m) ** 2:
+                m2 = 0.0  # Within rounding error of zero, as in `add`
+        else:
+            s, m, m2 = xn, xn, 0.0
+            n = 1
+        if self._data is not None:
+            self._data[n - 1] = xn
+        self._sums[n - 1] = s
+        self._means[n - 1] = m
+        self._vars[n - 1] = m2 / n
+        self._count = n
+        self._set_prev()
+
+    def add(self, x: list[float]) -> None:
+        x = np.asarray(x, dtype=float)
+        if x.size == 1:
+            return self._add_one(x.item())
+        if x.size == 0:
+            return
+        self._ensure(x.size)
+        n, k = self._count, x.size
+        sums = self._sums[n : n + k]
+        np.cumsum(x, out=sums)
+        sums += self.sum
+        # Summaries of each prefix of the batch. The sums of squared deviations are
+        # taken about the batch mean, which keeps them small and avoids catastrophic
+        # cancellation.
+        counts_b = np.arange(1, k + 1)
+        shift = x.mean()
+        devs_b = np.cumsum(x - shift) / counts_b
+        means_b = shift + devs_b
+        sq_devs_b = np.cumsum((x - shift) ** 2)
+        m2s_b = sq_devs_b - counts_b * devs_b**2
+        # Merge each prefix into the summaries before the batch
+        if n:
+            mean_a, m2_a = self.mean, n * self.var
+        else:
+            mean_a, m2_a = 0.0, 0.0
+        counts, means, m2s = _welford_combine(n, mean_a, m2_a, counts_b, means_b, m2s_b)
+        # Sums of squared deviations within rounding error of zero are zero, as they
+        # are for constant data in `_add_one`. The error comes from the spacing of
+        # floats around the mean, and from the cancellation in `m2s_b`. Otherwise a
+        # tiny positive variance would make the result depend on how the data was
+        # split into batches.
+        m2s[m2s <= counts * (2 * _EPS * means) ** 2 + 4 * _EPS * sq_devs_b] = 0
+        self._means[n : n + k] = means
+        np.maximum(m2s / counts, 0, out=self._vars[n : n + k])
+        if self._data is not None:
+            self._data[n : n + k] = x
+        self._count = n + k
+        self._set_prev()
+
+    def _set_prev(self) -> None:
+        """
+        Stores the summaries at the second-to-last time point.
+        """
+        n = self._count
+        if n > 1:
+            self.prev_sum = self._sums[n - 2]
+            self.prev_mean = self._means[n - 2]
+            self.prev_var = self._vars[n - 2]
 
 
 class FPRunningSummaries(RunningSummaries):
@@ -134,12 +277,38 @@ class FPRunningSummaries(RunningSummaries):
     Currently, also calculates out-of-sample means, given an initial reference mean.
     """
 
-    def __init__(self, pop_size: int, pop_mean: float):
-        super().__init__()
+    __slots__ = (
+        "_pop_size",
+        "_pop_mean",
+        "_oos_means",
+        "_oos_sums",
+        "oos_mean",
+        "prev_oos_mean",
+        "prev_oos_sum",
+    )
+
+    #: The current out-of-sample mean of the data stream.
+    oos_mean: float
+    #: The previous out-of-sample mean of the data stream, i.e. at the second-to-last
+    #: time point.
+    prev_oos_mean: float
+    #: The previous out-of-sample sum of the data stream, i.e. at the second-to-last
+    #: time point.
+    prev_oos_sum: float
+
+    def __init__(self, pop_size: int, pop_mean: float, keep_data: bool = False):
+        super().__init__(keep_data)
         self._pop_size = pop_size
         self._pop_mean = pop_mean
-        self._oos_means = [self.pop_mean]
-        self._oos_sums = [self.pop_mean * self.pop_size]
+        # The out-of-sample buffers have one more entry in use than the others: the
+        # first entry is the full population, before any observations were taken.
+        self._oos_means = np.empty(self._sums.size + 1)
+        self._oos_sums = np.empty(self._sums.size + 1)
+        self._oos_means[0] = self.pop_mean
+        self._oos_sums[0] = self.pop_mean * self.pop_size
+        self.oos_mean = self._oos_means[0]
+        self.prev_oos_mean = np.nan
+        self.prev_oos_sum = np.nan
 
     @property
     def pop_mean(self):
@@ -167,53 +336,50 @@ class FPRunningSummaries(RunningSummaries):
         """
         The historical out-of-sample means of the data stream, up to the current time.
         """
-        return self._oos_means
-
-    @property
-    def prev_oos_mean(self):
-        """
-        The previous out-of-sample mean of the data stream, i.e. at the second-to-last
-        time point.
-        """
-        return self._oos_means[-2] if len(self._oos_means) > 1 else np.nan
-
-    @property
-    def oos_mean(self):
-        """
-        The current out-of-sample mean of the data stream.
-        """
-        return self._oos_means[-1] if self._oos_means else np.nan
+        return self._oos_means[: self._count + 1]
 
     @property
     def hist_oos_sums(self):
         """
         The historical out-of-sample sums of the data stream, up to the current time.
         """
-        return self._oos_sums
-
-    @property
-    def prev_oos_sum(self):
-        """
-        The previous out-of-sample sum of the data stream, i.e. at the second-to-last
-        time point.
-        """
-        return self._oos_sums[-2] if len(self._oos_sums) > 1 else np.nan
+        return self._oos_sums[: self._count + 1]
 
     @property
     def oos_sum(self):
         """
         The current out-of-sample sum of the data stream.
         """
-        return self._oos_sums[-1]
+        return self._oos_sums[self._count]
+
+    def _ensure(self, k: int) -> None:
+        super()._ensure(k)
+        # The out-of-sample histories also hold the summaries before any observations
+        if self._count + k + 1 > self._oos_sums.size:
+            self._oos_means, self._oos_sums = grow_buffers(
+                self._count + 1, k, self._oos_means, self._oos_sums
+            )
 
     def add(self, x: list[float]) -> None:
-        if len(x) > self.oos_count:
-            raise TooManySamplesError(len(x), self.count, self.pop_size)
+        x = np.asarray(x, dtype=float).ravel()
+        k, oos_count = len(x), self.oos_count
+        if k > oos_count:
+            raise TooManySamplesError(k, self.count, self.pop_size)
+        if not k:
+            return
+        oos_sum = self.oos_sum
         super().add(x)
-        new_oos_sums = [self._oos_sums[0] - s for s in self._sums[-len(x) :]]
-        self._oos_sums.extend(new_oos_sums)
+        n = self._count
+        # Each observation is taken out of the out-of-sample sum in turn
+        new_oos_sums = self._oos_sums[n - k + 1 : n + 1]
+        np.cumsum(x, out=new_oos_sums)
+        np.subtract(oos_sum, new_oos_sums, out=new_oos_sums)
         with np.errstate(divide="ignore", invalid="ignore"):
-            self._oos_means.extend(
-                new_oos_sums
-                / np.arange(self.oos_count + len(x) - 1, self.oos_count - 1, -1)
+            np.divide(
+                new_oos_sums,
+                np.arange(oos_count - 1, oos_count - k - 1, -1),
+                out=self._oos_means[n - k + 1 : n + 1],
             )
+        self.oos_mean = self._oos_means[n]
+        self.prev_oos_mean = self._oos_means[n - 1]
+        self.prev_oos_sum = self._oos_sums[n - 1]